@@ -1,23 +1,26 @@
 import os
-import subprocess
+import sys
 from dotenv import load_dotenv
+from schemachange.cli import main as schemachange_main
+
+load_dotenv()
+
+# Required environment variables for schemachange, read once at import
+ENV_VARS = {
+    'SNOWFLAKE_ACCOUNT': os.getenv('SNOWFLAKE_ACCOUNT'),
+    'SNOWFLAKE_USER': os.getenv('SNOWFLAKE_USER'),
+    'SNOWFLAKE_PASSWORD': os.getenv('SNOWFLAKE_PASSWORD'),
+    'SNOWFLAKE_ROLE': os.getenv('SNOWFLAKE_ROLE'),
+    'SNOWFLAKE_WAREHOUSE': os.getenv('SNOWFLAKE_WAREHOUSE'),
+    'SNOWFLAKE_DATABASE': os.getenv('SNOWFLAKE_DATABASE'),
+    'SNOWFLAKE_SCHEMA': os.getenv('SNOWFLAKE_SCHEMA')
+}
+
+# Filter out None values
+ENV_VARS = {k: v for k, v in ENV_VARS.items() if v is not None}
 
 def main():
-    load_dotenv()
-    
-    # Required environment variables for schemachange
-    env_vars = {
-        'SNOWFLAKE_ACCOUNT': os.getenv('SNOWFLAKE_ACCOUNT'),
-        'SNOWFLAKE_USER': os.getenv('SNOWFLAKE_USER'),
-        'SNOWFLAKE_PASSWORD': os.getenv('SNOWFLAKE_PASSWORD'),
-        'SNOWFLAKE_ROLE': os.getenv('SNOWFLAKE_ROLE'),
-        'SNOWFLAKE_WAREHOUSE': os.getenv('SNOWFLAKE_WAREHOUSE'),
-        'SNOWFLAKE_DATABASE': os.getenv('SNOWFLAKE_DATABASE'),
-        'SNOWFLAKE_SCHEMA': os.getenv('SNOWFLAKE_SCHEMA')
-    }
-    
-    # Filter out None values
-    env_vars = {k: v for k, v in env_vars.items() if v is not None}
+    env_vars = ENV_VARS
     
     # Construct schemachange command
     command = [
@@ -38,13 +41,19 @@ def main():
     os.environ['SNOWFLAKE_PASSWORD'] = env_vars.get('SNOWFLAKE_PASSWORD', '')
     
     print("Running schemachange migrations...")
+    # Run schemachange in-process; its CLI entry point parses sys.argv. Mutate the list
+    # in place: schemachange 3.x binds main(argv=sys.argv) at import time.
+    saved_argv = sys.argv[:]
+    sys.argv[:] = command
     try:
-        result = subprocess.run(command, check=True, capture_output=True, text=True)
-        print(result.stdout)
-    except subprocess.CalledProcessError as e:
+        schemachange_main()
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            print(f"Error running schemachange: exit code {e.code}")
+    except Exception as e:
         print(f"Error running schemachange: {e}")
-        print(e.stdout)
-        print(e.stderr)
+    finally:
+        sys.argv[:] = saved_argv
 
 if __name__ == "__main__":
     main()
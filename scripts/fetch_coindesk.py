@@ -1,13 +1,17 @@
 import os
 import requests
+import orjson
 import pandas as pd
 import yaml
 import snowflake.connector
-from snowflake.connector.pandas_tools import write_pandas
 from datetime import datetime, timezone
 import uuid
+import tempfile
 from dotenv import load_dotenv
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Load environment variables for local development
 load_dotenv()
@@ -23,6 +27,46 @@ logger = logging.getLogger(__name__)
 CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'config.yml')
 OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'coindesk')
 
+# Snowflake connection settings, read once at import
+SF_CONN_KWARGS = {
+    'user': os.getenv('SNOWFLAKE_USER'),
+    'password': os.getenv('SNOWFLAKE_PASSWORD'),
+    'account': os.getenv('SNOWFLAKE_ACCOUNT'),
+    'warehouse': os.getenv('SNOWFLAKE_WAREHOUSE'),
+    'database': os.getenv('SNOWFLAKE_DATABASE'),
+    'schema': os.getenv('SNOWFLAKE_SCHEMA')
+}
+API_KEY = os.getenv('CRYPTOCOMPARE_API_KEY') or os.getenv('API_KEY')
+
+# Rows per Parquet file when staging a MERGE; several files let PUT upload in parallel
+PARQUET_CHUNK_ROWS = 250_000
+
+# Column name sanitising: spaces and dashes become underscores
+_COLUMN_TRANSLATION = str.maketrans({' ': '_', '-': '_'})
+
+# Workers for CryptoCompare fetches and for Snowflake ingests sharing one session
+FETCH_WORKERS = 8
+INGEST_WORKERS = 4
+
+# Pooled, gzip-enabled HTTP session shared by the fetch workers
+_SESSION = requests.Session()
+_SESSION.headers.update({'Accept-Encoding': 'gzip, deflate', 'Accept': 'application/json'})
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.2)
+))
+
+# Seconds to wait on CryptoCompare before giving up on a key
+HTTP_TIMEOUT = 30
+
+# (columns, exists, has_row) per (connection, SCHEMA.TABLE), filled by get_table_meta.
+# Schemas are managed by schemachange, so entries never need invalidating mid-run.
+_TABLE_META_CACHE = {}
+
+def _table_meta_key(conn, schema_name, table_name):
+    return id(conn), f"{schema_name}.{table_name}".upper()
+
 def load_config(path: str) -> dict:
     if not os.path.exists(path):
         logger.error(f"Config file not found at {path}")
@@ -31,98 +75,122 @@ def load_config(path: str) -> dict:
         return yaml.safe_load(f)
 
 def get_api_key():
-    from dotenv import load_dotenv
-    load_dotenv()
-    return os.getenv('CRYPTOCOMPARE_API_KEY')
+    return API_KEY
 
 def get_snowflake_conn():
     try:
-        conn = snowflake.connector.connect(
-            user=os.getenv('SNOWFLAKE_USER'),
-            password=os.getenv('SNOWFLAKE_PASSWORD'),
-            account=os.getenv('SNOWFLAKE_ACCOUNT'),
-            warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
-            database=os.getenv('SNOWFLAKE_DATABASE'),
-            schema=os.getenv('SNOWFLAKE_SCHEMA')
-        )
+        conn = snowflake.connector.connect(**SF_CONN_KWARGS)
         return conn
     except Exception as e:
         logger.error(f"Could not connect to Snowflake: {e}")
         return None
 
-def check_table_status(conn, schema_name, table_name):
+def get_table_meta(conn, schema_name, table_name):
     """
-    Returns (exists, row_count)
+    Returns (columns, exists, has_row) for the table in a single metadata round-trip.
+    Results are cached per connection and table for the lifetime of the process.
     """
+    cache_key = _table_meta_key(conn, schema_name, table_name)
+    if cache_key in _TABLE_META_CACHE:
+        return _TABLE_META_CACHE[cache_key]
+
     try:
         cursor = conn.cursor()
-        # Check if table exists
-        cursor.execute(f"SHOW TABLES LIKE '{table_name.upper()}' IN SCHEMA {schema_name}")
-        if cursor.fetchone():
-            # Get count
-            cursor.execute(f"SELECT COUNT(*) FROM {schema_name}.{table_name}")
-            result = cursor.fetchone()
-            count = result[0] if result else 0
-            return True, count
-        return False, 0
+        cursor.execute(
+            f"""
+            SELECT COLUMN_NAME, (SELECT 1 FROM {schema_name}.{table_name} LIMIT 1) AS HAS_ROW
+            FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
+            ORDER BY ORDINAL_POSITION
+            """,
+            (schema_name.upper(), table_name.upper())
+        )
+        rows = cursor.fetchall()
     except Exception as e:
-        logger.error(f"Error checking table status for {table_name}: {e}")
-        return False, 0
+        # The row probe fails to compile when the table is missing
+        logger.error(f"Error fetching metadata for {table_name}: {e}")
+        return [], False, False
+
+    columns = [row[0].upper() for row in rows]
+    meta = (columns, bool(rows), bool(rows) and rows[0][1] is not None)
+    _TABLE_META_CACHE[cache_key] = meta
+    return meta
 
-def get_table_columns(conn, schema_name, table_name):
+def put_parquet(cursor, df, stage_location):
     """
-    Returns a list of uppercase column names for the table.
+    Writes df as Snappy Parquet chunks and uploads them to stage_location with a single parallel PUT.
     """
-    try:
-        cursor = conn.cursor()
-        cursor.execute(f"DESCRIBE TABLE {schema_name}.{table_name}")
-        columns = [row[0].upper() for row in cursor.fetchall()]
-        return columns
-    except Exception as e:
-        logger.error(f"Error fetching columns for {table_name}: {e}")
-        return []
+    # We assume columns are already upper-cased in df
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for i, start in enumerate(range(0, len(df), PARQUET_CHUNK_ROWS)):
+            chunk_path = os.path.join(tmp_dir, f"chunk_{i}.parquet")
+            df.iloc[start:start + PARQUET_CHUNK_ROWS].to_parquet(chunk_path, compression='snappy', index=False)
+
+        # Convert to forward slashes for Snowflake
+        upload_dir = tmp_dir.replace('\\', '/')
+        cursor.execute(
+            f"PUT 'file://{upload_dir}/*.parquet' {stage_location} "
+            f"PARALLEL=8 AUTO_COMPRESS=FALSE SOURCE_COMPRESSION=AUTO_DETECT OVERWRITE=TRUE"
+        )
 
-def perform_merge(conn, df, schema_name, table_name, unique_key):
+def perform_merge(conn, df, schema_name, table_name, unique_keys, columns):
     """
     Performs a MERGE operation into the target table using a temporary staging table.
+    unique_keys is the list of columns that together identify a row; columns are the
+    DataFrame columns that exist in the target table.
+    Returns True if the MERGE ran.
     """
     # Create a temporary staging table name
     stage_table = f"{table_name}_STAGE_{uuid.uuid4().hex[:8]}".upper()
     
-    try:
-        # 1. Upload to Stage (Auto-create temp table)
-        # We assume columns are already upper-cased in df
-        success, _, _, _ = write_pandas(
-            conn,
-            df,
-            schema= 'PUBLIC',
-            table_name= stage_table,
-            auto_create_table=True,
-            table_type="TEMPORARY",
-            quote_identifiers=True  # Quote identifiers to handle reserved keywords
-        )
-        if not success:
-            logger.error(f"Failed to upload to staging table {stage_table}")
-            return
+    dedup_table = f"{stage_table}_DEDUP"
 
-        # 2. Construct MERGE query
-        # Identify columns to update (all columns except the unique key)
-        columns = [c for c in df.columns]
-        
-        # Ensure unique_key is in columns
-        if unique_key not in columns:
-            logger.error(f"Error: Unique key {unique_key} not in dataframe columns: {columns}")
-            return
+    # Ensure every unique key is in columns
+    missing_keys = [k for k in unique_keys if k not in columns]
+    if missing_keys:
+        logger.error(f"Error: Unique key {missing_keys} not in dataframe columns: {columns}")
+        return False
+
+    key_list = ", ".join([f'"{k}"' for k in unique_keys])
+    # Range-bound the leading key so target micro-partitions outside the batch are pruned
+    range_key = unique_keys[0]
 
+    try:
+        cursor = conn.cursor()
+
+        # 1. Create the temp staging table with the same shape as the target
+        cursor.execute(f"CREATE OR REPLACE TEMPORARY TABLE PUBLIC.{stage_table} LIKE {schema_name}.{table_name}")
+
+        # 2. Load the DataFrame with a single parallel PUT + COPY
+        put_parquet(cursor, df, f"@PUBLIC.%{stage_table}")
+        cursor.execute(f"""
+        COPY INTO PUBLIC.{stage_table}
+        FROM @PUBLIC.%{stage_table}
+        FILE_FORMAT = (TYPE = PARQUET USE_VECTORIZED_SCANNER = TRUE)
+        MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE
+        """)
+
+        # 3. Deduplicate on the key and cluster like the target so the MERGE join is collocated
+        cursor.execute(f"""
+        CREATE OR REPLACE TEMPORARY TABLE PUBLIC.{dedup_table} CLUSTER BY ({key_list}) AS
+        SELECT * FROM PUBLIC.{stage_table}
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY {key_list} ORDER BY {key_list}) = 1
+        """)
+
+        # 4. Construct MERGE query
         # Quote column names to handle reserved keywords like TO, FROM
-        update_clause = ", ".join([f't."{col}" = s."{col}"' for col in columns if col != unique_key])
+        update_clause = ", ".join([f't."{col}" = s."{col}"' for col in columns if col not in unique_keys])
+        on_clause = " AND ".join([f't."{k}" = s."{k}"' for k in unique_keys])
         insert_cols = ", ".join([f'"{col}"' for col in columns])
         insert_vals = ", ".join([f's."{col}"' for col in columns])
 
+        # The key range predicate lets Snowflake prune target micro-partitions
         merge_sql = f"""
         MERGE INTO {schema_name}.{table_name} t
-        USING PUBLIC.{stage_table} s
-        ON t."{unique_key}" = s."{unique_key}"
+        USING PUBLIC.{dedup_table} s
+        ON {on_clause}
+            AND t."{range_key}" BETWEEN (SELECT MIN("{range_key}") FROM PUBLIC.{dedup_table})
+                                    AND (SELECT MAX("{range_key}") FROM PUBLIC.{dedup_table})
         WHEN MATCHED THEN
             UPDATE SET {update_clause}
         WHEN NOT MATCHED THEN
@@ -130,137 +198,137 @@ def perform_merge(conn, df, schema_name, table_name, unique_key):
             VALUES ({insert_vals})
         """
         
-        # 3. Execute Merge
-        cursor = conn.cursor()
+        # 5. Execute Merge
         cursor.execute(merge_sql)
         logger.info(f"Merged data into {table_name} successfully.")
+        return True
 
     except Exception as e:
         logger.error(f"Error during MERGE for {table_name}: {e}")
-    finally:
-        # Temp tables drop automatically at session end, but good practice to clean up if long running
-        try:
-             conn.cursor().execute(f"DROP TABLE IF EXISTS {stage_table}")
-        except:
-            pass
+        return False
+    # No explicit DROP: temp tables are session-scoped and go away when the shared connection closes
 
-def upload_and_fetch_from_snowflake(df, schema_name, table_name, unique_key=None):
+def export_table_csv(conn, schema_name, table_name, sort_col, file_path):
     """
-    1. Uploads/Merges fresh df to Snowflake.
-    2. Downloads the full unique dataset.
+    Writes the full unique dataset to file_path via fetch_pandas_all + to_csv, so the
+    committed CSVs keep pandas' number, timestamp and JSON formatting.
+    Returns the number of rows exported.
+    """
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT DISTINCT * FROM {schema_name}.{table_name} ORDER BY "{sort_col}" ASC')
+    result_df = cursor.fetch_pandas_all()
+    result_df.to_csv(file_path, index=False)
+    return len(result_df)
+
+def upload_and_fetch_from_snowflake(conn, df, schema_name, table_name, file_path, unique_key=None):
+    """
+    1. Uploads/Merges fresh df to Snowflake over the shared connection.
+       unique_key is a column name or a list of column names forming a composite key.
+    2. Exports the full unique dataset to file_path.
+    Returns True if file_path was written from Snowflake.
     """
-    conn = get_snowflake_conn()
     if not conn:
-        logger.warning("Skipping Snowflake operations (no connection). Returning original DF.")
-        return df
+        logger.warning("Skipping Snowflake operations (no connection). Keeping original DF.")
+        return False
 
     try:
         # Standardize columns to uppercase for Snowflake consistency
-        df.columns = [c.upper().replace(' ', '_').replace('-', '_') for c in df.columns]
+        df.columns = [c.translate(_COLUMN_TRANSLATION).upper() for c in df.columns]
         
-        # Check if table exists and get row count
-        table_exists, row_count = check_table_status(conn, schema_name, table_name)
+        # Fetch columns, existence and emptiness in one round-trip
+        table_cols, table_exists, has_row = get_table_meta(conn, schema_name, table_name)
         
         if not table_exists:
             logger.error(f"Error: Table {table_name} does not exist. Please run schemachange first.")
-            return df
+            return False
 
-        # Filter DF columns to match Snowflake table columns
-        table_cols = get_table_columns(conn, schema_name, table_name)
-        if table_cols:
-            original_cols = df.columns.tolist()
-            matching_cols = [c for c in df.columns if c in table_cols]
-            df = df[matching_cols].copy()
-            logger.info(f"Filtered {table_name} DataFrame to {len(df.columns)} columns matching Snowflake schema.")
+        # Columns the table knows about; only these are written to Parquet and staged
+        matching_cols = [c for c in df.columns if c in table_cols]
 
-        if df.empty or len(df.columns) == 0:
+        if df.empty or len(matching_cols) == 0:
             logger.warning(f"Warning: No columns in {table_name} DataFrame match the Snowflake schema. Skipping upload.")
-            logger.warning(f"DataFrame had columns: {original_cols if 'original_cols' in locals() else df.columns.tolist()}")
-            logger.warning(f"Snowflake table expected: {table_cols if table_cols else 'Could not fetch table columns'}")
-            return df
+            logger.warning(f"DataFrame had columns: {df.columns.tolist()}")
+            logger.warning(f"Snowflake table expected: {table_cols}")
+            return False
 
         # Logic for Bulk vs Delta
-        if row_count >= 1 and unique_key and unique_key.upper() in df.columns:
+        merge_keys = [k.upper() for k in ([unique_key] if isinstance(unique_key, str) else unique_key or [])]
+        if has_row and merge_keys and all(k in matching_cols for k in merge_keys):
             # Incremental load: Merge
-            logger.info(f"Table {table_name} has {row_count} rows. Performing MERGE (Delta Load) on {unique_key}...")
-            perform_merge(conn, df, schema_name, table_name, unique_key.upper())
+            logger.info(f"Table {table_name} has rows. Performing MERGE (Delta Load) on {merge_keys}...")
+            if not perform_merge(conn, df[matching_cols], schema_name, table_name, merge_keys, matching_cols):
+                return False
+        elif len(df) == 1 and unique_key is None:
+            # Single-row snapshot (pricemultifull, tradingsignals): one INSERT, no file upload
+            logger.info(f"Inserting single-row snapshot into {table_name}...")
+            columns = ', '.join([f'"{col}"' for col in matching_cols])
+            placeholders = ', '.join(['%s'] * len(matching_cols))
+            row = df.iloc[0][matching_cols]
+            values = [None if pd.api.types.is_scalar(v) and pd.isna(v) else v for v in row.tolist()]
+
+            cursor = conn.cursor()
+            cursor.execute(f"INSERT INTO {schema_name}.{table_name} ({columns}) VALUES ({placeholders})", values)
+            logger.info(f"Inserted 1 row into {schema_name}.{table_name}")
+
+            # The table now has rows; keep the cached metadata in sync
+            _TABLE_META_CACHE[_table_meta_key(conn, schema_name, table_name)] = (table_cols, True, True)
         else:
             # Bulk load or Append (no unique key)
-            load_type = "Bulk Load (Empty Table)" if row_count == 0 else "Append (No Unique Key)"
-            logger.info(f"Table {table_name} has {row_count} rows. Performing {load_type}...")
+            load_type = "Append (No Unique Key)" if has_row else "Bulk Load (Empty Table)"
+            logger.info(f"Table {table_name} {'has rows' if has_row else 'is empty'}. Performing {load_type}...")
+            
+            cursor = conn.cursor()
+            
+            # Create internal stage if it doesn't exist
+            cursor.execute(f"CREATE TEMPORARY STAGE IF NOT EXISTS TEMP_STAGE")
             
-            # Use CSV upload method to avoid Windows temp file issues
-            import tempfile
-            import os as os_module
+            # Upload to a per-load prefix so concurrent ingests don't share files
+            stage_location = f"@TEMP_STAGE/{table_name}_{uuid.uuid4().hex[:8]}/"
+            put_parquet(cursor, df[matching_cols], stage_location)
             
-            # Create a temporary CSV file
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False, newline='') as tmp_file:
-                tmp_path = tmp_file.name
-                df.to_csv(tmp_file, index=False, header=True)
+            copy_sql = f"""
+            COPY INTO {schema_name}.{table_name}
+            FROM {stage_location}
+            FILE_FORMAT = (TYPE = PARQUET USE_VECTORIZED_SCANNER = TRUE)
+            MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE
+            ON_ERROR = CONTINUE
+            """
             
-            try:
-                cursor = conn.cursor()
-                
-                # Create internal stage if it doesn't exist
-                cursor.execute(f"CREATE TEMPORARY STAGE IF NOT EXISTS TEMP_STAGE")
-                
-                # Upload file to stage (convert to forward slashes for Snowflake)
-                upload_path = tmp_path.replace('\\', '/')
-                cursor.execute(f"PUT 'file://{upload_path}' @TEMP_STAGE AUTO_COMPRESS=FALSE OVERWRITE=TRUE")
-                
-                # Get filename
-                filename = os_module.path.basename(tmp_path)
-                
-                # Copy data from stage to table
-                columns = ', '.join([f'"{col}"' for col in df.columns])
-                
-                copy_sql = f"""
-                COPY INTO {schema_name}.{table_name} ({columns})
-                FROM @TEMP_STAGE/{filename}
-                FILE_FORMAT = (TYPE = CSV SKIP_HEADER = 1 FIELD_OPTIONALLY_ENCLOSED_BY = '"')
-                ON_ERROR = CONTINUE
-                """
-                
-                cursor.execute(copy_sql)
-                result = cursor.fetchone()
-                logger.info(f"Uploaded {result[1]} rows successfully to {schema_name}.{table_name}")
-                
-            finally:
-                # Clean up temp file
-                try:
-                    os_module.unlink(tmp_path)
-                except:
-                    pass
+            cursor.execute(copy_sql)
+            # One result row per file: (file, status, rows_parsed, rows_loaded, ...)
+            rows_loaded = sum(row[3] for row in cursor.fetchall())
+            logger.info(f"Uploaded {rows_loaded} rows successfully to {schema_name}.{table_name}")
+
+            # ON_ERROR = CONTINUE can skip every row; only mark the table non-empty if something landed
+            if rows_loaded:
+                _TABLE_META_CACHE[_table_meta_key(conn, schema_name, table_name)] = (table_cols, True, True)
 
         # 2. Export (Full Dataset)
-        sort_col = "TIMESTAMP" if "TIMESTAMP" in df.columns else ("TIME" if "TIME" in df.columns else df.columns[0])
-        query = f'SELECT DISTINCT * FROM {schema_name}.{table_name} ORDER BY "{sort_col}" ASC'
+        sort_col = "TIMESTAMP" if "TIMESTAMP" in matching_cols else ("TIME" if "TIME" in matching_cols else matching_cols[0])
 
-        logger.info(f"Fetching full updated data from {table_name}...")
-        cursor = conn.cursor()
-        cursor.execute(query)
-        result_df = cursor.fetch_pandas_all()
+        logger.info(f"Exporting full updated data from {table_name}...")
+        row_count = export_table_csv(conn, schema_name, table_name, sort_col, file_path)
 
-        logger.info(f"Retrieved {len(result_df)} rows from Snowflake.")
-        return result_df
+        logger.info(f"Exported {row_count} rows to {file_path} (Full Dataset).")
+        return True
 
     except Exception as e:
         logger.error(f"Snowflake Error for {table_name}: {e}")
-        return df 
-    finally:
-        conn.close()
+        return False
 
-def process_and_save(key: str, url: str, api_key: str):
+def fetch_json(key: str, url: str, api_key: str):
+    """
+    Fetches the raw JSON payload for a key. Returns None if skipped or failed.
+    """
     # --- Always use limit 2000 and merge strategy ---
     limit_val = 2000
-    table_name = f"COINDESK_{key.upper()}"
     logger.info(f"[{key}] Fetching with limit: {limit_val}")
     
     # Inject API Key
     if '{API_KEY}' in url:
         if not api_key:
             logger.warning(f"Skipping {key}: API key required but not found.")
-            return
+            return None
         url = url.replace('{API_KEY}', api_key)
 
     # Inject Limit
@@ -268,128 +336,142 @@ def process_and_save(key: str, url: str, api_key: str):
         url = url.replace('{LIMIT}', str(limit_val))
 
     try:
-        response = requests.get(url)
+        response = _SESSION.get(url, timeout=HTTP_TIMEOUT)
         response.raise_for_status()
-        data = response.json()
-        
-        df = None
-        unique_key = None
-        
-        # --- Parsing Logic ---
-        if key == 'pricemultifull':
-            # Structure: {"RAW":{"BTC":{"USD":{...}}}}
-            try:
-                raw_data = data.get('RAW', {}).get('BTC', {}).get('USD', {})
-                if raw_data:
-                    df = pd.DataFrame([raw_data])
-                    # No unique key for price log, we just append snapshots
-            except AttributeError:
-                pass
-
-        elif key in ['histoday', 'histohour', 'hourly_social_data']:
-            # Structure: {"Data": {"Data": [...]}}
-            try:
-                if 'Data' in data and isinstance(data['Data'], dict) and 'Data' in data['Data']:
-                     df = pd.DataFrame(data['Data']['Data'])
-                elif 'Data' in data and isinstance(data['Data'], list):
-                     df = pd.DataFrame(data['Data'])
-                
-                # Identify Merge Key
-                if df is not None:
-                     # OHLC Specific: Map volumeto -> volume
-                     if key in ['histoday', 'histohour']:
-                         if 'volumeto' in df.columns:
-                             df['volume'] = df['volumeto']
-                         
-                         # Remove original volume and conversion columns
-                         cols_to_drop = [c for c in ['volumeto', 'volumefrom', 'conversionType', 'conversionSymbol'] if c in df.columns]
-                         if cols_to_drop:
-                             df.drop(columns=cols_to_drop, inplace=True)
-
-                     if 'time' in df.columns: unique_key = 'TIME' # Will be uppercased later
-            except Exception:
-                pass
-
-        elif key == 'blockchain_balancedistribution':
-             try:
-                 if 'Data' in data and isinstance(data['Data'], dict) and 'Data' in data['Data']:
-                     items_list = data['Data']['Data']
-                     if items_list and isinstance(items_list, list) and len(items_list) > 0:
-                         # Check if first item has balance_distribution
-                         if 'balance_distribution' in items_list[0]:
-                             df = pd.json_normalize(
-                                 items_list,
-                                 record_path=['balance_distribution'],
-                                 meta=['id', 'symbol', 'partner_symbol', 'time'],
-                                 errors='ignore'
-                             )
-                             logger.info(f"Blockchain balance distribution: Parsed {len(df)} rows with columns: {list(df.columns)}")
-                             # Handle unique key for exploded data
-                             if 'time' in df.columns and 'from' in df.columns and 'to' in df.columns:
-                                 df['merge_key'] = df['time'].astype(str) + "_" + df['from'].astype(str) + "_" + df['to'].astype(str)
-                                 unique_key = 'MERGE_KEY'
-                                 logger.info(f"Created merge_key for blockchain data with {len(df)} records")
-                         else:
-                             df = pd.DataFrame(items_list)
-             except Exception as e:
-                 logger.error(f"Error parsing blockchain_balancedistribution: {e}")
-                 
-        elif key in ['tadingsignals', 'tradingsignals']:
-             try:
-                 if 'Data' in data and isinstance(data['Data'], dict):
-                    flat_data = {}
-
-                    # Map new API field names to old Snowflake column names
-                    field_mapping = {
-                        'addressesNetGrowth': 'ltHandsTh',
-                        'concentrationVar': 'concentration',
-                        'largetxsVar': 'largeSurplus',
-                        'inOutVar': 'inOutVar'  # This one stays the same
-                    }
-
-                    for signal_name, signal_data in data['Data'].items():
-                        # Map to old field name if available
-                        mapped_name = field_mapping.get(signal_name, signal_name)
-
-                        if isinstance(signal_data, dict):
-                             for k, v in signal_data.items():
-                                 # Skip metadata fields, only keep sentiment and value
-                                 if k in ['sentiment', 'value']:
-                                     flat_data[f"{mapped_name}_{k}"] = v if v is not None else None
-                        else:
-                             flat_data[mapped_name] = signal_data if signal_data is not None else None
-
-                    # Add fetched_at timestamp
-                    flat_data['fetched_at'] = datetime.now(timezone.utc).isoformat()
-                    df = pd.DataFrame([flat_data])
-                    logger.info(f"Trading signals parsed successfully with {len(flat_data)} fields")
-             except Exception as e:
-                 logger.error(f"Error parsing tradingsignals: {e}")
-                 pass
-
-        elif key == 'news':
-            if 'Data' in data and isinstance(data['Data'], list):
-                df = pd.DataFrame(data['Data'])
-                # News might have an ID
-                if 'id' in df.columns: unique_key = 'ID'
-        
+        return orjson.loads(response.content)
+    except Exception as e:
+        logger.error(f"Error fetching {key}: {e}")
+        return None
+
+def parse_payload(key: str, data):
+    """
+    Turns a raw payload into (df, unique_key) according to the key's structure.
+    """
+    df = None
+    unique_key = None
+    
+    # --- Parsing Logic ---
+    if key == 'pricemultifull':
+        # Structure: {"RAW":{"BTC":{"USD":{...}}}}
+        try:
+            raw_data = data.get('RAW', {}).get('BTC', {}).get('USD', {})
+            if raw_data:
+                df = pd.DataFrame([raw_data])
+                # No unique key for price log, we just append snapshots
+        except AttributeError:
+            pass
+
+    elif key in ['histoday', 'histohour', 'hourly_social_data']:
+        # Structure: {"Data": {"Data": [...]}}
+        try:
+            if 'Data' in data and isinstance(data['Data'], dict) and 'Data' in data['Data']:
+                 df = pd.DataFrame(data['Data']['Data'])
+            elif 'Data' in data and isinstance(data['Data'], list):
+                 df = pd.DataFrame(data['Data'])
+            
+            # Identify Merge Key
+            if df is not None:
+                 # OHLC Specific: Map volumeto -> volume
+                 if key in ['histoday', 'histohour']:
+                     if 'volumeto' in df.columns:
+                         df['volume'] = df['volumeto']
+                     
+                     # Remove original volume and conversion columns
+                     cols_to_drop = [c for c in ['volumeto', 'volumefrom', 'conversionType', 'conversionSymbol'] if c in df.columns]
+                     if cols_to_drop:
+                         df.drop(columns=cols_to_drop, inplace=True)
+
+                 if 'time' in df.columns: unique_key = 'TIME' # Will be uppercased later
+        except Exception:
+            pass
+
+    elif key == 'blockchain_balancedistribution':
+         try:
+             if 'Data' in data and isinstance(data['Data'], dict) and 'Data' in data['Data']:
+                 items_list = data['Data']['Data']
+                 if items_list and isinstance(items_list, list) and len(items_list) > 0:
+                     # Check if first item has balance_distribution
+                     if 'balance_distribution' in items_list[0]:
+                         df = pd.json_normalize(
+                             items_list,
+                             record_path=['balance_distribution'],
+                             meta=['id', 'symbol', 'partner_symbol', 'time'],
+                             errors='ignore'
+                         )
+                         logger.info(f"Blockchain balance distribution: Parsed {len(df)} rows with columns: {list(df.columns)}")
+                         # Handle unique key for exploded data
+                         if 'time' in df.columns and 'from' in df.columns and 'to' in df.columns:
+                             # MERGE_KEY is the table's primary key, so keep populating it (one concat pass)
+                             df['merge_key'] = df['time'].astype(str).str.cat([df['from'].astype(str), df['to'].astype(str)], sep='_')
+                             # Merge on the composite key itself so Snowflake can prune on TIME
+                             unique_key = ['TIME', 'FROM', 'TO']
+                             logger.info(f"Created merge_key for blockchain data with {len(df)} records")
+                     else:
+                         df = pd.DataFrame(items_list)
+         except Exception as e:
+             logger.error(f"Error parsing blockchain_balancedistribution: {e}")
+             
+    elif key in ['tadingsignals', 'tradingsignals']:
+         try:
+             if 'Data' in data and isinstance(data['Data'], dict):
+                flat_data = {}
+
+                # Map new API field names to old Snowflake column names
+                field_mapping = {
+                    'addressesNetGrowth': 'ltHandsTh',
+                    'concentrationVar': 'concentration',
+                    'largetxsVar': 'largeSurplus',
+                    'inOutVar': 'inOutVar'  # This one stays the same
+                }
+
+                for signal_name, signal_data in data['Data'].items():
+                    # Map to old field name if available
+                    mapped_name = field_mapping.get(signal_name, signal_name)
+
+                    if isinstance(signal_data, dict):
+                         for k, v in signal_data.items():
+                             # Skip metadata fields, only keep sentiment and value
+                             if k in ['sentiment', 'value']:
+                                 flat_data[f"{mapped_name}_{k}"] = v if v is not None else None
+                    else:
+                         flat_data[mapped_name] = signal_data if signal_data is not None else None
+
+                # Add fetched_at timestamp
+                flat_data['fetched_at'] = datetime.now(timezone.utc).isoformat()
+                df = pd.DataFrame([flat_data])
+                logger.info(f"Trading signals parsed successfully with {len(flat_data)} fields")
+         except Exception as e:
+             logger.error(f"Error parsing tradingsignals: {e}")
+             pass
+
+    elif key == 'news':
+        if 'Data' in data and isinstance(data['Data'], list):
+            df = pd.DataFrame(data['Data'])
+            # News might have an ID
+            if 'id' in df.columns: unique_key = 'ID'
+    
+    else:
+        # Fallback
+        if 'Data' in data:
+             if isinstance(data['Data'], list):
+                 df = pd.DataFrame(data['Data'])
+             elif isinstance(data['Data'], dict) and 'Data' in data['Data']:
+                  df = pd.DataFrame(data['Data']['Data'])
+             else:
+                  df = pd.DataFrame([data['Data']]) if isinstance(data['Data'], dict) else pd.DataFrame([data])
         else:
-            # Fallback
-            if 'Data' in data:
-                 if isinstance(data['Data'], list):
-                     df = pd.DataFrame(data['Data'])
-                 elif isinstance(data['Data'], dict) and 'Data' in data['Data']:
-                      df = pd.DataFrame(data['Data']['Data'])
-                 else:
-                      df = pd.DataFrame([data['Data']]) if isinstance(data['Data'], dict) else pd.DataFrame([data])
-            else:
-                 if isinstance(data, list):
-                     df = pd.DataFrame(data)
-                 else:
-                     df = pd.DataFrame([data])
-
-        # --- Snowflake & Saving Logic ---
-        
+             if isinstance(data, list):
+                 df = pd.DataFrame(data)
+             else:
+                 df = pd.DataFrame([data])
+
+    return df, unique_key
+
+def ingest(key: str, df, unique_key, conn):
+    """
+    Uploads df to Snowflake and exports the full table to CSV.
+    """
+    try:
         if df is not None and not df.empty:
             # Add timestamp if completely missing
             if 'timestamp' not in df.columns and 'time' not in df.columns and 'TIMESTAMP' not in df.columns:
@@ -399,20 +481,35 @@ def process_and_save(key: str, url: str, api_key: str):
             schema_name = "COINDESK"
             table_name = f"{key.upper()}"
             
-            # Upload to Snowflake and get back the FULL updated table
-            final_df = upload_and_fetch_from_snowflake(df, schema_name,table_name, unique_key)
-            
             os.makedirs(OUTPUT_DIR, exist_ok=True)
             file_path = os.path.join(OUTPUT_DIR, f'{key}.csv')
             
-            final_df.to_csv(file_path, index=False)
-            logger.info(f"Exported {len(final_df)} rows to {file_path} (Full Dataset).")
+            # Upload to Snowflake and export the FULL updated table straight to file_path
+            exported = upload_and_fetch_from_snowflake(conn, df, schema_name, table_name, file_path, unique_key)
+            
+            if not exported:
+                df.to_csv(file_path, index=False)
+                logger.info(f"Exported {len(df)} fetched rows to {file_path} (Snowflake unavailable).")
 
         else:
             logger.warning(f"Warning: No valid data extracted for {key}")
 
+    except Exception as e:
+        logger.error(f"Error ingesting {key}: {e}")
+
+def fetch_and_parse(key: str, url: str, api_key: str):
+    """
+    Fetches and parses one key. Returns (df, unique_key), or None if skipped or failed.
+    """
+    data = fetch_json(key, url, api_key)
+    if data is None:
+        return None
+
+    try:
+        return parse_payload(key, data)
     except Exception as e:
         logger.error(f"Error processing {key}: {e}")
+        return None
 
 if __name__ == "__main__":
     logger.info(f"Loading config from {CONFIG_FILE}")
@@ -420,5 +517,25 @@ if __name__ == "__main__":
 
     api_key = get_api_key()
 
-    for key, url in config.items():
-        process_and_save(key, url, api_key)
+    # One Snowflake session for all keys; each ingest uses its own cursor on it
+    conn = get_snowflake_conn()
+    try:
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as fetch_pool, \
+             ThreadPoolExecutor(max_workers=INGEST_WORKERS) as ingest_pool:
+            fetches = {
+                fetch_pool.submit(fetch_and_parse, key, url, api_key): key
+                for key, url in config.items()
+            }
+            ingests = []
+            for future in as_completed(fetches):
+                parsed = future.result()
+                if parsed is None:
+                    continue
+                df, unique_key = parsed
+                ingests.append(ingest_pool.submit(ingest, fetches[future], df, unique_key, conn))
+
+            for future in as_completed(ingests):
+                future.result()
+    finally:
+        if conn:
+            conn.close()
@@ -1,8 +1,8 @@
 import os
 import re
 import json
+import csv
 from datetime import datetime, timezone
-import pandas as pd
 from firecrawl import FirecrawlApp
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
@@ -16,6 +16,9 @@ FIRECRAWL_API_KEY = os.getenv('FIRECRAWL_API_KEY')
 URL = "https://newhedge.io/bitcoin"
 OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'newhedge')
 
+# Quoted argument of a ':contains(...)' pseudo-selector
+_QUOTED = re.compile(r"['\"](.*?)['\"]")
+
 def clean_extracted_value(value, key):
     """Post-process extracted values to clean up duplicates and errors."""
     if not value:
@@ -121,8 +124,42 @@ def extract_usd_with_percentage(value):
     
     return amount, percentage
 
-def extract_element(soup, selector):
-    """Extracts text based on various selector types."""
+# Selector types that locate their element by searching text nodes, and the key holding the text
+TEXT_SELECTOR_FIELDS = {
+    'next_sibling': 'text',
+    'dashboard_primary': 'context',
+    'dashboard_secondary': 'context',
+}
+
+def compile_text_needles(selectors):
+    """Collects the distinct search texts used by text-based selectors."""
+    needles = set()
+    for selector in selectors.values():
+        if isinstance(selector, dict) and selector.get('type') in TEXT_SELECTOR_FIELDS:
+            needle = selector.get(TEXT_SELECTOR_FIELDS[selector['type']])
+            if needle:
+                needles.add(needle)
+    return needles
+
+SELECTOR_NEEDLES = compile_text_needles(SELECTORS)
+
+def find_text_nodes(soup, needles):
+    """Walks every text node once, returning {needle: [matching strings in document order]}."""
+    matches = {needle: [] for needle in needles}
+    for text in soup.find_all(string=True):
+        if not text:
+            continue
+        for needle in needles:
+            if needle in text:
+                matches[needle].append(text)
+    return matches
+
+def extract_element(soup, selector, text_matches=None):
+    """Extracts text based on various selector types.
+
+    text_matches is an optional result of find_text_nodes; when given, text-based
+    selectors look up their candidates there instead of walking the DOM again.
+    """
     try:
         # Handle dictionary selectors (new format)
         if isinstance(selector, dict):
@@ -139,7 +176,10 @@ def extract_element(soup, selector):
                 search_text = selector.get('text')
                 context = selector.get('context')  # Optional context to narrow search
                 
-                elements = soup.find_all(string=lambda x: x and search_text in x)
+                if text_matches is not None and search_text in text_matches:
+                    elements = text_matches[search_text]
+                else:
+                    elements = soup.find_all(string=lambda x: x and search_text in x)
                 
                 for elem in elements:
                     # If context is provided, check if we're in the right section
@@ -177,7 +217,10 @@ def extract_element(soup, selector):
                 # Find dashboard primary text in context
                 context = selector.get('context')
                 # Find section containing context
-                section = soup.find(string=lambda x: x and context in x)
+                if text_matches is not None and context in text_matches:
+                    section = text_matches[context][0] if text_matches[context] else None
+                else:
+                    section = soup.find(string=lambda x: x and context in x)
                 if section:
                     container = section.find_parent().find_parent()
                     if container:
@@ -189,7 +232,10 @@ def extract_element(soup, selector):
             elif selector_type == 'dashboard_secondary':
                 # Find dashboard secondary text in context
                 context = selector.get('context')
-                section = soup.find(string=lambda x: x and context in x)
+                if text_matches is not None and context in text_matches:
+                    section = text_matches[context][0] if text_matches[context] else None
+                else:
+                    section = soup.find(string=lambda x: x and context in x)
                 if section:
                     container = section.find_parent().find_parent()
                     if container:
@@ -204,7 +250,7 @@ def extract_element(soup, selector):
                 parts = selector.split(":contains")
                 base_tag = parts[0].strip() or "p"
                 
-                match = re.search(r"['\"](.*?)['\"]", parts[1])
+                match = _QUOTED.search(parts[1])
                 if not match:
                     return None
                 search_text = match.group(1)
@@ -341,6 +387,15 @@ def scrape_table(soup, table_config):
         traceback.print_exc()
         return []
 
+def append_csv_rows(output_file, rows):
+    """Appends dict rows to a CSV, writing the header only when the file is new."""
+    need_header = not os.path.isfile(output_file)
+    with open(output_file, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        if need_header:
+            writer.writeheader()
+        writer.writerows(rows)
+
 # ===== MAIN SCRAPING FUNCTION =====
 
 def fetch_data():
@@ -360,14 +415,15 @@ def fetch_data():
             print("No HTML content returned.")
             return
 
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = BeautifulSoup(html_content, 'lxml')
         timestamp = datetime.now(timezone.utc)
         
         # Extract all raw data points
         print("Extracting data points...")
         raw_data = {}
+        text_matches = find_text_nodes(soup, SELECTOR_NEEDLES)
         for key, selector in SELECTORS.items():
-            value = extract_element(soup, selector)
+            value = extract_element(soup, selector, text_matches)
             # Clean up the value
             value = clean_extracted_value(value, key)
             raw_data[key] = value
@@ -721,10 +777,7 @@ def fetch_data():
         print("\nSaving core metrics to CSV files...")
         for table_name, table_data in tables.items():
             output_file = os.path.join(OUTPUT_DIR, f'{table_name}.csv')
-            file_exists = os.path.isfile(output_file)
-            
-            df = pd.DataFrame([table_data])
-            df.to_csv(output_file, mode='a', header=not file_exists, index=False)
+            append_csv_rows(output_file, [table_data])
             print(f"  ✓ {table_name}.csv")
         
         # Save table data (companies, ETFs, etc.)
@@ -737,9 +790,7 @@ def fetch_data():
                 for row in data:
                     row['TIMESTAMP'] = timestamp
                 
-                df = pd.DataFrame(data)
-                file_exists = os.path.isfile(output_file)
-                df.to_csv(output_file, mode='a', header=not file_exists, index=False)
+                append_csv_rows(output_file, data)
                 print(f"  ✓ {table_name.lower()}.csv ({len(data)} rows)")
         
         # Save raw data for debugging
@@ -1,28 +1,70 @@
 import os
-import pandas as pd
+import pyarrow.csv as pacsv
 import snowflake.connector
 from snowflake.connector.pandas_tools import write_pandas
 from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 load_dotenv()
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
 
+# Snowflake connection settings, read once at import
+SF_CONN_KWARGS = {
+    'user': os.getenv('SNOWFLAKE_USER'),
+    'password': os.getenv('SNOWFLAKE_PASSWORD'),
+    'account': os.getenv('SNOWFLAKE_ACCOUNT'),
+    'warehouse': os.getenv('SNOWFLAKE_WAREHOUSE'),
+    'database': os.getenv('SNOWFLAKE_DATABASE'),
+    'schema': os.getenv('SNOWFLAKE_SCHEMA')
+}
+
+# Concurrent CSV uploads per folder
+UPLOAD_WORKERS = 4
+
+# Column name sanitising: spaces and dashes become underscores, parentheses are dropped
+_COLUMN_TRANSLATION = str.maketrans({' ': '_', '-': '_', '(': None, ')': None})
+
 def get_snowflake_conn():
     try:
-        conn = snowflake.connector.connect(
-            user=os.getenv('SNOWFLAKE_USER'),
-            password=os.getenv('SNOWFLAKE_PASSWORD'),
-            account=os.getenv('SNOWFLAKE_ACCOUNT'),
-            warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
-            database=os.getenv('SNOWFLAKE_DATABASE'),
-            schema=os.getenv('SNOWFLAKE_SCHEMA')
-        )
+        conn = snowflake.connector.connect(**SF_CONN_KWARGS)
         return conn
     except Exception as e:
         print(f"Could not connect to Snowflake: {e}")
         return None
 
+def _upload_one(conn, file_path, schema_name, table_name):
+    """Upload a single CSV file to an existing table. Returns a status message."""
+    # Arrow's multithreaded CSV reader; conversion to pandas is zero-copy for primitive columns
+    table = pacsv.read_csv(
+        file_path,
+        read_options=pacsv.ReadOptions(use_threads=True),
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),  # news.csv has multi-line quoted cells
+        # Empty cells load as NULL, as pandas.read_csv did
+        convert_options=pacsv.ConvertOptions(strings_can_be_null=True, quoted_strings_can_be_null=True)
+    )
+    df = table.to_pandas(self_destruct=True)
+    del table
+    
+    # sanitize columns
+    df.columns = [c.translate(_COLUMN_TRANSLATION).upper() for c in df.columns]
+    
+    # Write to snowflake
+    success, n_chunks, n_rows, _ = write_pandas(
+        conn,
+        df,
+        table_name,
+        schema=schema_name,
+        auto_create_table=False,  # Tables created by migration
+        quote_identifiers=False,
+        parallel=16,
+        use_logical_type=True  # Keep Arrow timestamps as logical types
+    )
+    
+    if success:
+        return f"Uploaded {n_rows} rows to {schema_name}.{table_name}"
+    return f"Failed to upload {os.path.basename(file_path)} to {schema_name}.{table_name}"
+
 def upload_folder(conn, folder_name, schema_name='PUBLIC'):
     """Upload CSV files from a folder to Snowflake with schema support."""
     folder_path = os.path.join(DATA_DIR, folder_name)
@@ -34,38 +76,28 @@ def upload_folder(conn, folder_name, schema_name='PUBLIC'):
     cursor.execute(f"USE SCHEMA {schema_name}")
     cursor.close()
 
+    # Collect (file_path, table_name) pairs first
+    uploads = []
     for root, dirs, files in os.walk(folder_path):
         for file in files:
             if file.endswith(".csv"):
-                file_path = os.path.join(root, file)
-                print(f"Processing {file_path}...")
-                
-                try:
-                    df = pd.read_csv(file_path)
-                    
-                    # sanitize columns
-                    df.columns = [c.upper().replace(' ', '_').replace('(', '').replace(')', '').replace('-', '_') for c in df.columns]
-                    
-                    # Table name based on file name
-                    # For CoinDesk: use the existing table names from migration
-                    table_name = file.replace('.csv', '').upper()
-                    
-                    # Write to snowflake
-                    success, n_chunks, n_rows, _ = write_pandas(
-                        conn,
-                        df,
-                        table_name,
-                        auto_create_table=False,  # Tables created by migration
-                        quote_identifiers=False
-                    )
-                    
-                    if success:
-                        print(f"Uploaded {n_rows} rows to {schema_name}.{table_name}")
-                    else:
-                        print(f"Failed to upload {file} to {schema_name}.{table_name}")
-                        
-                except Exception as e:
-                    print(f"Error uploading {file}: {e}")
+                # Table name based on file name
+                # For CoinDesk: use the existing table names from migration
+                table_name = file.replace('.csv', '').upper()
+                uploads.append((os.path.join(root, file), table_name))
+
+    # Upload in parallel; each write_pandas call uses its own cursor on the shared connection
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+        futures = {}
+        for file_path, table_name in uploads:
+            print(f"Processing {file_path}...")
+            futures[executor.submit(_upload_one, conn, file_path, schema_name, table_name)] = file_path
+
+        for future in as_completed(futures):
+            try:
+                print(future.result())
+            except Exception as e:
+                print(f"Error uploading {os.path.basename(futures[future])}: {e}")
 
 def main():
     conn = get_snowflake_conn()